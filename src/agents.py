@@ -1,8 +1,13 @@
-import random
+import math
+import re
+from functools import lru_cache
 
 from strands import Agent, tool
 from strands.models import BedrockModel
-# from strands_tools import calculator, current_time
+
+
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_TUPLE_RE = re.compile(rf"\(\s*({_NUMBER})\s*,\s*({_NUMBER})\s*\)")
 
 
 @tool
@@ -19,53 +24,64 @@ def euclidean_distance(p1: tuple[float, float], p2: tuple[float, float]) -> floa
         5.0
     """
 
-    return ((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2) ** 0.5
+    return math.hypot(p1[0] - p2[0], p1[1] - p2[1])
+
 
+# The only tool a movement decision needs; every extra tool adds its schema to each prompt
+_MOVEMENT_TOOLS = [euclidean_distance]
 
-def llm_based_cell_movement(universe_state: dict[str, any], cell_state: dict[str, any]) -> dict:
-    
-    # Create a BedrockModel
-    bedrock_model = BedrockModel(
+
+@lru_cache(maxsize=1)
+def _bedrock_model() -> BedrockModel:
+    """Bedrock client shared by every movement call (built on first use)."""
+    return BedrockModel(
         model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
         region_name="us-west-2",
         temperature=0.3,
     )
 
-    # Create an agent with tools from the community-driven strands-tools package
-    # as well as our custom letter_counter tool
-    agent = Agent(
-        model=bedrock_model,
-        tools=[euclidean_distance],
-    )
 
-    # Ask the agent a question that uses the available tools
-    message = f"""
-    You are a biological cell in a 2D universe. You have the following state:
-    Cell State: {cell_state}
+def _batch_movement_prompt(universe_state: dict[str, any], cell_states: list[dict[str, any]]) -> str:
+    cells = "\n".join(f"    {cell_state}" for cell_state in cell_states)
+    return f"""
+    You are steering {len(cell_states)} biological cells in a 2D universe.
     Universe State: {universe_state}
+    Cell States (one per line):
+{cells}
 
-    Based on your current state and the universe state, decide your next velocity
-    as a tuple (vx, vy) where vx and vy are floats representing the velocity x and y coordinates.
-    Your objective is to find food and avoid venom, and get the food before your energy runs out and others eat it
-    Example: If your current position is (100, 150) and you decide to move right
-    by 5 and up by 3, you should respond with (5.0, 3.0).
+    For every cell, decide its next velocity as a tuple (vx, vy) where vx and vy are floats
+    representing the velocity x and y coordinates.
+    The objective of each cell is to find food and avoid venom, and get the food before its energy runs out and others eat it
     You need to calculate the Euclidean distance to nearby food and venom.
 
-    Respond only with the tuple (vx, vy) and nothing else.
+    Respond only with one tuple (vx, vy) per line, in the same order as the cells, and nothing else.
     """
-    response = agent(message)
+
+
+def _response_text(response) -> str:
     try:
-        # Expecting a tuple (dx, dy)
-        movement_str = response.message["content"][0]["text"].rsplit('\n', 1)[-1]
-        movement = eval(movement_str)
-        if isinstance(movement, tuple) and len(movement) == 2:
-            return movement
-        else:
-            print("Invalid response format. Expected a tuple (dx, dy).")
-            return (0.0, 0.0)
-    except Exception as e:
-        print(f"Error parsing response: {e}, got response: {response}")
-        # random_angle = random.uniform(0, 2 * math.pi)
-        return (random.uniform(0, 2), random.uniform(0, 2))
+        return response.message["content"][0]["text"]
+    except (KeyError, IndexError, TypeError):
+        return ""
+
+
+def _parse_movements(response, n: int) -> list[tuple[float, float]]:
+    # Expecting n tuples (dx, dy) in cell order; missing ones default to standing still
+    text = _response_text(response)
+    moves = [(float(vx), float(vy)) for vx, vy in _TUPLE_RE.findall(text)[:n]]
+    if len(moves) < n:
+        print(f"Expected {n} tuples (dx, dy), got {len(moves)} in response: {text!r}")
+        moves += [(0.0, 0.0)] * (n - len(moves))
+    return moves
 
 
+def llm_batch_movement(universe_state: dict[str, any], cell_states: list[dict[str, any]]) -> list[tuple[float, float]]:
+    """
+    Decides the velocity of many cells with a single LLM request (one tuple per cell, in order).
+    Blocking; meant to be run off the simulation thread.
+    """
+    if not cell_states:
+        return []
+    agent = Agent(model=_bedrock_model(), tools=_MOVEMENT_TOOLS, callback_handler=None)
+    response = agent(_batch_movement_prompt(universe_state, cell_states))
+    return _parse_movements(response, len(cell_states))
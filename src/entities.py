@@ -1,12 +1,21 @@
 from __future__ import annotations
+import itertools
 from dataclasses import dataclass
 from typing import Tuple
-from uuid import UUID
 
 
-@dataclass
+# Monotonic ids shared by foods and venoms
+_entity_ids = itertools.count()
+
+
+def new_entity_id() -> int:
+    """Next unique food/venom id."""
+    return next(_entity_ids)
+
+
+@dataclass(slots=True)
 class Food:
-    id: UUID
+    id: int
     energy: float
     position: Tuple[float, float]
 
@@ -18,15 +27,15 @@ class Food:
     @property
     def state(self) -> dict:
         return {
-            "id": str(self.id),
+            "id": self.id,
             "energy": self.energy,
             "position": self.position,
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Venom:
-    id: UUID
+    id: int
     toxicity: float
     position: Tuple[float, float]
 
@@ -38,7 +47,7 @@ class Venom:
     @property
     def state(self) -> dict:
         return {
-            "id": str(self.id),
+            "id": self.id,
             "energy": self.toxicity,
             "position": self.position,
         }
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""
+Numeric kernels for the Population step.
+Every kernel updates the SoA columns in place. Random draws are made by the
+caller so the Numba and NumPy implementations produce the same results.
+
+A step is, per living cell: metabolism -> random turn -> steer towards the
+closest food -> exact Ornstein-Uhlenbeck move, flagging the cells eligible to
+reproduce on the way. With Numba these run fused in one parallel pass; the
+NumPy fallback runs them as whole-column passes.
+
+`uniform` holds three rows of per-cell draws: heading change, speed factor
+and the reproduction roll in [0, 1).
+"""
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; the NumPy implementations below are used instead
+    njit = None
+
+
+# Share of the velocity redirected towards the closest food each step
+FOOD_INFLUENCE = 0.3
+
+
+def _metabolism_numpy(age, energy, vx, vy, basal, move_cost, max_age, live) -> np.ndarray:
+    # Returns every cell's speed so later stages need no further sqrt
+    speed = np.hypot(vx, vy)
+    age += 1
+    energy -= basal + move_cost * speed
+    np.logical_and(age < max_age, energy > 5.0, out=live)
+    energy *= live  # branchless zero-flush of the dead
+    return speed
+
+
+def _spawn_numpy(energy, age, live, repro_energy, repro_age, repro_prob, uniform, spawn) -> None:
+    np.logical_and(live, energy >= repro_energy, out=spawn)
+    spawn &= age >= repro_age
+    spawn &= uniform[2] < repro_prob
+
+
+def _turn_numpy(vx, vy, live, uniform, speed) -> np.ndarray:
+    # Small random change of heading, speed rescaled (never below 0.5); returns the living cells' new speed.
+    # The heading is rotated by the drawn angle, so the current angle is never computed;
+    # a cell at rest starts along +x.
+    speed = speed[live]
+    moving = speed > 0.0
+    inv = np.divide(1.0, speed, out=np.zeros_like(speed), where=moving)
+    ux = np.where(moving, vx[live] * inv, 1.0)
+    uy = vy[live] * inv
+    theta = uniform[0, live]
+    c, s = np.cos(theta), np.sin(theta)
+    speed = np.maximum(0.5, speed * uniform[1, live])
+    vx[live] = (c * ux - s * uy) * speed
+    vy[live] = (s * ux + c * uy) * speed
+    return speed
+
+
+def _steer_numpy(x, y, vx, vy, live, food_xy, closest, speed) -> None:
+    if len(food_xy) == 0:
+        vx[live] = 0.0
+        vy[live] = 0.0
+        return
+
+    vx_live, vy_live = vx[live], vy[live]
+    target = food_xy[closest[live]]
+    dx = target[:, 0] - x[live]
+    dy = target[:, 1] - y[live]
+    dist2 = dx * dx + dy * dy
+
+    # Decide on squared distances; one sqrt and one division per cell for the unit direction
+    moving = dist2 > 0
+    scale = np.divide(speed, np.sqrt(dist2), out=np.zeros_like(dist2), where=moving)
+    vx[live] = np.where(moving, (1 - FOOD_INFLUENCE) * vx_live + FOOD_INFLUENCE * dx * scale, 0.0)
+    vy[live] = np.where(moving, (1 - FOOD_INFLUENCE) * vy_live + FOOD_INFLUENCE * dy * scale, 0.0)
+
+
+def _ou_coefficients(accel_sigma, accel_tau, dt):
+    """
+    Exact Ornstein-Uhlenbeck transition over `dt`: a' = a * decay + noise * z.
+    Stable for any step size; works on scalars and per-cell arrays alike.
+    """
+    tau = np.maximum(0.08, accel_tau)
+    decay = np.exp(-dt / tau)
+    noise = accel_sigma * np.sqrt(0.5 * tau * (1.0 - decay * decay))
+    return decay, noise
+
+
+def _move_live_numpy(x, y, vx, vy, ax, ay, live, gauss, dt, decay, noise, keep) -> None:
+    # Ornstein-Uhlenbeck process for wandering
+    ax_live = ax[live] * decay + noise * gauss[0, live]
+    ay_live = ay[live] * decay + noise * gauss[1, live]
+
+    # Integrate acceleration with minimal damping
+    vx_live = (vx[live] + ax_live * dt) * keep
+    vy_live = (vy[live] + ay_live * dt) * keep
+
+    ax[live], ay[live] = ax_live, ay_live
+    vx[live], vy[live] = vx_live, vy_live
+    x[live] += vx_live
+    y[live] += vy_live
+
+
+def _step_numpy(age, energy, x, y, vx, vy, ax, ay, basal, move_cost, max_age,
+                accel_sigma, accel_tau, vel_damping, repro_energy, repro_age, repro_prob,
+                live, spawn, food_xy, closest, uniform, gauss, dt) -> None:
+    speed = _metabolism_numpy(age, energy, vx, vy, basal, move_cost, max_age, live)
+    _spawn_numpy(energy, age, live, repro_energy, repro_age, repro_prob, uniform, spawn)
+    speed = _turn_numpy(vx, vy, live, uniform, speed)
+    _steer_numpy(x, y, vx, vy, live, food_xy, closest, speed)
+    decay, noise = _ou_coefficients(accel_sigma[live], accel_tau[live], dt)
+    keep = 1.0 - np.clip(vel_damping[live] * dt, 0.0, 1.0)
+    _move_live_numpy(x, y, vx, vy, ax, ay, live, gauss, dt, decay, noise, keep)
+
+
+if njit is not None:
+
+    @njit(fastmath=True, cache=True)
+    def _step_cell(i, age, energy, x, y, vx, vy, ax, ay, live, spawn, food_xy, closest, uniform, gauss, dt,
+                   basal, move_cost, max_age, repro_energy, repro_age, repro_prob, decay, noise, keep) -> None:
+        # Metabolism; the dead are zeroed and skip the rest
+        age[i] += 1
+        v_x, v_y = vx[i], vy[i]
+        speed = math.sqrt(v_x * v_x + v_y * v_y)  # the only velocity sqrt of the step
+        e = energy[i] - basal - move_cost * speed
+        alive = age[i] < max_age and e > 5.0
+        live[i] = alive
+        if not alive:
+            energy[i] = 0.0
+            spawn[i] = False
+            return
+        energy[i] = e
+        spawn[i] = e >= repro_energy and age[i] >= repro_age and uniform[2, i] < repro_prob
+
+        # Random turn: rotate the heading by the drawn angle (a cell at rest starts along +x)
+        if speed > 0.0:
+            u_x, u_y = v_x / speed, v_y / speed
+        else:
+            u_x, u_y = 1.0, 0.0
+        c, s = math.cos(uniform[0, i]), math.sin(uniform[0, i])
+        speed = max(0.5, speed * uniform[1, i])
+        v_x, v_y = (c * u_x - s * u_y) * speed, (s * u_x + c * u_y) * speed
+
+        # Steer towards the closest food (stop when there is none, or when on top of it)
+        c = closest[i]
+        dx, dy, d2 = 0.0, 0.0, 0.0
+        if c >= 0:
+            dx = food_xy[c, 0] - np.float64(x[i])
+            dy = food_xy[c, 1] - np.float64(y[i])
+            d2 = dx * dx + dy * dy
+        if d2 > 0.0:
+            scale = speed / math.sqrt(d2)
+            v_x = (1 - FOOD_INFLUENCE) * v_x + FOOD_INFLUENCE * dx * scale
+            v_y = (1 - FOOD_INFLUENCE) * v_y + FOOD_INFLUENCE * dy * scale
+        else:
+            v_x, v_y = 0.0, 0.0
+
+        # Ornstein-Uhlenbeck acceleration, damping and position integration
+        a_x = ax[i] * decay + noise * gauss[0, i]
+        a_y = ay[i] * decay + noise * gauss[1, i]
+        v_x = (v_x + a_x * dt) * keep
+        v_y = (v_y + a_y * dt) * keep
+        ax[i], ay[i] = a_x, a_y
+        vx[i], vy[i] = v_x, v_y
+        x[i] += v_x
+        y[i] += v_y
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def step(age, energy, x, y, vx, vy, ax, ay, basal, move_cost, max_age,
+             accel_sigma, accel_tau, vel_damping, repro_energy, repro_age, repro_prob,
+             live, spawn, food_xy, closest, uniform, gauss, dt) -> None:
+        """
+        Fused metabolism, turn, food steering and OU move of every cell.
+        Survivors are flagged in `live`, cells eligible to reproduce in `spawn`.
+        """
+        for i in prange(energy.shape[0]):
+            tau = max(0.08, accel_tau[i])
+            decay = math.exp(-dt / tau)
+            noise = accel_sigma[i] * math.sqrt(0.5 * tau * (1.0 - decay * decay))
+            keep = 1.0 - min(1.0, max(0.0, vel_damping[i] * dt))
+            _step_cell(i, age, energy, x, y, vx, vy, ax, ay, live, spawn, food_xy, closest, uniform, gauss, dt,
+                       basal[i], move_cost[i], max_age[i],
+                       repro_energy[i], repro_age[i], repro_prob[i], decay, noise, keep)
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _step_shared(age, energy, x, y, vx, vy, ax, ay, live, spawn, food_xy, closest, uniform, gauss, dt,
+                     basal, move_cost, max_age, repro_energy, repro_age, repro_prob, decay, noise, keep) -> None:
+        # `step` for a population sharing one CellParams: the constants arrive as scalars
+        for i in prange(energy.shape[0]):
+            _step_cell(i, age, energy, x, y, vx, vy, ax, ay, live, spawn, food_xy, closest, uniform, gauss, dt,
+                       basal, move_cost, max_age, repro_energy, repro_age, repro_prob, decay, noise, keep)
+
+else:
+    step = _step_numpy
+
+
+@lru_cache(maxsize=None)
+def specialized_step(params, dt: float):
+    """
+    `step` with one species' constants (a CellParams) and the step size folded in.
+    Returns a kernel called as
+    kernel(age, energy, x, y, vx, vy, ax, ay, live, spawn, food_xy, closest, uniform, gauss).
+    """
+    basal, move_cost, max_age = params.basal_metabolism, params.move_cost_per_unit, params.max_age
+    repro_energy = params.reproduction_energy_threshold
+    repro_age = params.reproduction_age_threshold
+    repro_prob = params.reproduction_probability
+    decay, noise = map(float, _ou_coefficients(params.accel_sigma, params.accel_tau, dt))
+    keep = 1.0 - max(0.0, min(1.0, params.vel_damping * dt))
+
+    if njit is None:
+        decay, noise = np.float64(decay), np.float64(noise)  # Python floats would let float32 draws set the precision
+        def kernel(age, energy, x, y, vx, vy, ax, ay, live, spawn, food_xy, closest, uniform, gauss) -> None:
+            speed = _metabolism_numpy(age, energy, vx, vy, basal, move_cost, max_age, live)
+            _spawn_numpy(energy, age, live, repro_energy, repro_age, repro_prob, uniform, spawn)
+            speed = _turn_numpy(vx, vy, live, uniform, speed)
+            _steer_numpy(x, y, vx, vy, live, food_xy, closest, speed)
+            _move_live_numpy(x, y, vx, vy, ax, ay, live, gauss, dt, decay, noise, keep)
+        return kernel
+
+    # Scalar arguments to a cached kernel rather than closure constants: a closure would be
+    # recompiled in every process (about a second on the first step), for no measurable gain
+    constants = (float(dt), float(basal), float(move_cost), int(max_age),
+                 float(repro_energy), int(repro_age), float(repro_prob), decay, noise, keep)
+
+    def kernel(age, energy, x, y, vx, vy, ax, ay, live, spawn, food_xy, closest, uniform, gauss) -> None:
+        _step_shared(age, energy, x, y, vx, vy, ax, ay, live, spawn, food_xy, closest, uniform, gauss, *constants)
+
+    return kernel
@@ -1,13 +1,14 @@
 from __future__ import annotations
 
+import math
 import random
 import time
-from uuid import uuid4
-import matplotlib.pyplot as plt
+import matplotlib
 import argparse
+import numpy as np
 
-from cell import Cell
-from entities import Food, Venom
+from cell import Cell, CellParams, new_cell_id
+from entities import Food, Venom, new_entity_id
 
 from universe import Universe
 from render import Renderer
@@ -23,12 +24,22 @@ def create_parser() -> argparse.ArgumentParser:
     parser.add_argument("--cells", type=int, default=7, help="Initial number of cells")
     parser.add_argument("--food", type=int, default=5, help="Initial number of food items")
     parser.add_argument("--venom", type=int, default=5, help="Initial number of venom items")
+    parser.add_argument("--llm-movement", action="store_true",
+                       help="Steer cells with batched LLM requests (needs Bedrock access)")
     
     # Rendering parameters
     parser.add_argument("--fps", type=int, default=30, help="Target frames per second")
+    parser.add_argument("--sim-rate", type=float, default=90.0,
+                       help="Simulation steps per second, independent of rendering (0 = as fast as possible)")
     parser.add_argument("--update-every", type=int, default=2, help="Render every N frames")
     parser.add_argument("--no-scatter", action="store_false", dest="use_scatter", 
                        help="Use circle patches instead of scatter")
+    parser.add_argument("--headless", action="store_true",
+                       help="Render off-screen with the Agg backend (record-only runs, no window)")
+    parser.add_argument("--duration", type=float, default=0.0,
+                       help="Stop after this many seconds (0 = run until quit)")
+    parser.add_argument("--cycles", type=int, default=0,
+                       help="Stop after this many simulation steps (0 = run until quit)")
     
     # Recording parameters
     parser.add_argument("--record", action="store_true", help="Enable video recording")
@@ -38,6 +49,10 @@ def create_parser() -> argparse.ArgumentParser:
                        help="FPS for recording")
     parser.add_argument("--record-quality", type=int, default=8, choices=range(1, 11),
                        help="Recording quality (1-10, higher is better)")
+    parser.add_argument("--record-preset", type=str, default="ultrafast",
+                       choices=["ultrafast", "superfast", "veryfast", "faster", "fast",
+                                "medium", "slow", "slower", "veryslow"],
+                       help="x264 encoder preset for mp4/avi (slower presets give smaller files)")
     parser.add_argument("--record-format", type=str, default="mp4", 
                        choices=["mp4", "gif", "avi"], help="Output format for recording")
     
@@ -52,6 +67,9 @@ def main():
     """Main function with CLI integration"""
     parser = create_parser()
     args = parser.parse_args()
+
+    # Off-screen runs skip the Tk event loop and screen copies entirely
+    matplotlib.use("Agg" if args.headless else "TkAgg")
     
     # Initialize universe
     universe = Universe(
@@ -68,39 +86,46 @@ def main():
         max_new_venoms=2,
         min_unit_food=1.2,
         min_unit_venom=1.5,
+        llm_movement=args.llm_movement,
     )
     
     # Add initial entities
-    for _ in range(args.cells):
+    params = CellParams(
+        basal_metabolism=0.08,
+        reproduction_probability=0.05,
+        move_cost_per_unit=0.02,
+    )
+    # Positions and amounts drawn in bulk, one call per quantity
+    rng = np.random.default_rng()
+    extent = (universe.width, universe.height)
+    for x, y in rng.uniform((0.0, 0.0), extent, (args.cells, 2)).tolist():
         universe.add_cell(
             Cell(
-                id=uuid4(),
+                id=new_cell_id(),
                 energy=200.0,
-                position=(random.uniform(0, universe.width),
-                         random.uniform(0, universe.height)),
-                basal_metabolism=0.08,
-                reproduction_probability=0.05,
-                move_cost_per_unit=0.02,
+                x=x,
+                y=y,
+                params=params,
             )
         )
-        
-    for _ in range(args.food):
+
+    food_xy = rng.uniform((0.0, 0.0), extent, (args.food, 2)).tolist()
+    for (x, y), energy in zip(food_xy, rng.uniform(50.0, 100.0, args.food).tolist()):
         universe.add_food(
             Food(
-                id=uuid4(),
-                energy=random.uniform(50.0, 100.0),
-                position=(random.uniform(0, universe.width),
-                         random.uniform(0, universe.height))
+                id=new_entity_id(),
+                energy=energy,
+                position=(x, y),
             )
         )
 
-    for _ in range(args.venom):
+    venom_xy = rng.uniform((0.0, 0.0), extent, (args.venom, 2)).tolist()
+    for (x, y), toxicity in zip(venom_xy, rng.uniform(50.0, 100.0, args.venom).tolist()):
         universe.add_venom(
             Venom(
-                id=uuid4(),
-                toxicity=random.uniform(50.0, 100.0),
-                position=(random.uniform(0, universe.width),
-                         random.uniform(0, universe.height))
+                id=new_entity_id(),
+                toxicity=toxicity,
+                position=(x, y),
             )
         )
 
@@ -113,15 +138,25 @@ def main():
         recording_path=args.record_path,
         recording_fps=args.record_fps,
         recording_quality=args.record_quality,
+        recording_preset=args.record_preset,
     )
 
     print("Simulation Starting...")
     print(f"Universe: {args.width}x{args.height}")
     print(f"Entities: {args.cells} cells, {args.food} food, {args.venom} venom")
     print(f"Rendering: {args.fps} FPS target, update every {args.update_every} frames")
+    sim_rate = f"{args.sim_rate:g} steps/s" if args.sim_rate > 0 else "unthrottled"
+    print(f"Simulation: {sim_rate}")
     if args.record:
         print(f"Recording: {args.record_path}.{args.record_format} at {args.record_fps} FPS")
-    print("Controls: [R] Start recording, [S] Stop recording, [Q] Quit")
+    if args.duration > 0 or args.cycles > 0:
+        limits = [f"{args.duration:g} s"] if args.duration > 0 else []
+        limits += [f"{args.cycles} cycles"] if args.cycles > 0 else []
+        print(f"Stopping after: {' or '.join(limits)}")
+    if args.headless:
+        print("Headless: no window, stop with --duration/--cycles or Ctrl+C")
+    else:
+        print("Controls: [R] Start recording, [S] Stop recording, [Q] Quit")
 
     renderer.start(universe)
 
@@ -129,40 +164,57 @@ def main():
     if args.record:
         renderer.start_recording(args.record_format)
 
-    # Simulation loop
-    target_fps = args.fps
-    frame_time = 1.0 / target_fps
+    # Simulation loop: stepping and rendering run on their own wall-clock
+    # schedules, so slow frames do not slow the simulation down and a fast
+    # simulation is only drawn at the target fps
+    step_time = 1.0 / args.sim_rate if args.sim_rate > 0 else 0.0
+    frame_time = 1.0 / args.fps
     cycle_count = 0
-    start_time = time.time()
-    last_frame_time = start_time
+    next_step = next_frame = time.perf_counter()
+    stop_at = next_step + args.duration if args.duration > 0 else math.inf
+    max_cycles = args.cycles if args.cycles > 0 else math.inf
+
+    def step() -> None:
+        nonlocal cycle_count
+        input_energy = random.uniform(250.0, 300.0)
+        universe.run(input_energy=input_energy, cycle_count=cycle_count)
+        cycle_count += 1
 
     try:
-        while not renderer.stopped:
-            current_time = time.time()
-            elapsed = current_time - last_frame_time
-            
-            if elapsed >= frame_time:
-                cycle_count += 1
-                steps_per_frame = 3
-                for _ in range(steps_per_frame):
-                    input_energy = random.uniform(250.0, 300.0)
-                    universe.run(input_energy=input_energy, cycle_count=cycle_count)
-                    cycle_count += 1
-                
-                renderer.update(universe, cycle_idx=cycle_count)
-                last_frame_time = current_time
+        while not renderer.stopped and cycle_count < max_cycles and time.perf_counter() < stop_at:
+            now = time.perf_counter()
+            if step_time > 0.0:
+                # Every step due by now, but never past the frame deadline; when
+                # stepping cannot keep up, the backlog is dropped instead of
+                # starving the display
+                while next_step <= now and time.perf_counter() < next_frame and cycle_count < max_cycles:
+                    step()
+                    next_step += step_time
+                next_step = max(next_step, now)
             else:
-                time.sleep(0.0001)
-                
+                # Unthrottled: keep stepping until the next frame is due
+                step()
+                while time.perf_counter() < next_frame and cycle_count < max_cycles:
+                    step()
+
+            if time.perf_counter() >= next_frame:
+                renderer.update(universe, cycle_idx=cycle_count)
+                next_frame = time.perf_counter() + frame_time
+
+            wait = min(next_step, next_frame) - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+
     except KeyboardInterrupt:
         print("\nSimulation interrupted by user")
     finally:
         # Stop recording if active
         if renderer.recorder.is_recording:
             renderer.stop_recording()
+        universe.close()
     
     print("\nFinal state:")
-    print(f"Cells: {len(universe.cells)} | Food: {len(universe.foods)} | Venom: {len(universe.venoms)}")
+    print(f"Cells: {len(universe.population)} | Food: {len(universe.foods)} | Venom: {len(universe.venoms)}")
     print(f"Average render time: {renderer.average_render_time*1000:.1f}ms")
 
 
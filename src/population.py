@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import math
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Sequence
+
+import numpy as np
+
+import kernels
+import spatial
+from spatial import SpatialGrid
+from cell import Cell, CellParams, new_cell_ids
+from entities import Food
+from agents import llm_batch_movement
+
+
+# Per-cell constant parameters, one column per CellParams field (name -> dtype)
+_PARAM_FIELDS = {
+    "speed": np.float64,
+    "accel_sigma": np.float64,
+    "accel_tau": np.float64,
+    "vel_damping": np.float64,
+    "reproduction_probability": np.float64,
+    "reproduction_energy_threshold": np.float64,
+    "reproduction_age_threshold": np.int64,
+    "basal_metabolism": np.float64,
+    "move_cost_per_unit": np.float64,
+    "max_energy": np.float64,
+    "color_mutation_rate": np.float64,
+    "color_mutation_strength": np.float64,
+    "max_age": np.int64,
+}
+
+# Mutable per-cell state (name -> dtype)
+_STATE_FIELDS = {
+    "energy": np.float64,
+    "x": np.float32,
+    "y": np.float32,
+    "vx": np.float64,
+    "vy": np.float64,
+    "ax": np.float64,
+    "ay": np.float64,
+    "age": np.int64,
+}
+
+# Largest random change of heading per step (±10 degrees)
+_MAX_TURN = math.radians(10)
+_TURN_SPAN = 2.0 * _MAX_TURN
+_TWO_PI = 2.0 * math.pi
+
+# state_view / snapshot_to key -> column (a living cell's diameter is its energy)
+_VIEW_COLUMNS = {
+    "id": "ids",
+    "energy": "energy",
+    "x": "x",
+    "y": "y",
+    "diameter": "energy",
+    "age": "age",
+    "color": "color",
+}
+
+# Steps between two batched LLM movement requests (see Population._move_llm)
+_LLM_REFRESH_STEPS = 10
+
+# Rows allocated up front; buffers double whenever the population outgrows them
+_INITIAL_CAPACITY = 64
+
+
+class Population:
+    """
+    Cell population stored as a structure of arrays (one slot per cell):
+      A) State columns (energy, x, y, vx, vy, ax, ay, age, color) updated in place
+      B) Per-cell constant parameters inherited unchanged by offspring
+      C) Vectorized lifecycle step replacing the per-instance Cell.run
+
+    Cell objects are only built on demand as read-only views (see `cell`).
+    Columns are views of the first len(self) rows of preallocated buffers, so
+    births and deaths move rows within capacity instead of reallocating.
+    Random draws for a step come in bulk from a single PCG64 generator.
+    While every cell shares one parameter set (offspring inherit theirs), the
+    step runs kernels specialized for those constants.
+    """
+
+    def __init__(self, seed: int | None = None):
+        self.rng = np.random.default_rng(seed)
+        self._buffers = {"ids": np.empty(_INITIAL_CAPACITY, dtype=np.int64)}
+        for name, dtype in (_STATE_FIELDS | _PARAM_FIELDS).items():
+            self._buffers[name] = np.empty(_INITIAL_CAPACITY, dtype=dtype)
+        self._buffers["color"] = np.empty((_INITIAL_CAPACITY, 3), dtype=np.float64)
+        self._set_size(0)
+        self._shared_params: CellParams | None = None
+
+        # Out-of-band LLM steering: latest decisions by cell id, next request in the background
+        # (the worker thread is started by the first _move_llm call)
+        self._llm_executor: ThreadPoolExecutor | None = None
+        self._llm_request: Future | None = None
+        self._llm_ids = np.empty(0, dtype=np.int64)
+        self._llm_velocity = np.empty((0, 2), dtype=np.float64)
+        self._llm_idle_steps = _LLM_REFRESH_STEPS
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, cell: Cell) -> None:
+        """Append a single cell, copying its state and parameters into the columns."""
+        params = cell.params
+        if len(self) == 0:
+            self._shared_params = params
+        elif params != self._shared_params:
+            self._shared_params = None
+
+        columns = {name: [getattr(cell, name)] for name in _STATE_FIELDS}
+        columns.update({name: [getattr(params, name)] for name in _PARAM_FIELDS})
+        self._append([cell.id], color=[cell.color], **columns)
+
+    def cell(self, i: int) -> Cell:
+        """Build a Cell view of slot `i` (a snapshot; writes are not reflected back)."""
+        params = self._shared_params
+        if params is None:
+            params = CellParams(**{name: getattr(self, name)[i].item() for name in _PARAM_FIELDS})
+        fields = {name: getattr(self, name)[i].item() for name in _STATE_FIELDS}
+        return Cell(
+            id=self.ids[i].item(),
+            color=tuple(self.color[i].tolist()),
+            params=params,
+            **fields,
+        )
+
+    def cells(self) -> List[Cell]:
+        return [self.cell(i) for i in range(len(self))]
+
+    def state_view(self) -> dict[str, np.ndarray]:
+        """Columns of the living cells (id, energy, x, y, diameter, age, color); no per-cell objects."""
+        alive = self.energy > 0
+        return {name: getattr(self, column)[alive] for name, column in _VIEW_COLUMNS.items()}
+
+    def snapshot_to(self, out: dict[str, np.ndarray]) -> int:
+        """
+        Write state_view columns of the living cells into caller-owned arrays, so a
+        per-frame consumer can reuse its buffers. Only the keys present in `out` are
+        filled; each array needs a row per living cell. Returns the number of rows written.
+        """
+        alive = self.energy > 0
+        m = int(np.count_nonzero(alive))
+        for name, array in out.items():
+            np.compress(alive, getattr(self, _VIEW_COLUMNS[name]), axis=0, out=array[:m])
+        return m
+
+    def step(self, foods: Sequence[Food], max_cells: int, dt: float = 1.0,
+             llm_state: Callable[[], dict] | None = None) -> np.ndarray:
+        """
+        Executes a single lifecycle step for every cell at once:
+        - Metabolism: age, basal and movement costs; cells that die are zeroed
+          and skip the rest of the step.
+        - Randomly changes direction with small angle adjustments.
+        - Steers towards the closest food (cells stop when there is none).
+        - Ornstein-Uhlenbeck wandering, damping and position integration.
+        - LLM steering, only when `llm_state` is given (see `_move_llm`).
+        - Reproduction.
+        Args:
+            foods: Food entities the cells steer towards.
+            max_cells: Offspring are only added if the population stays within this limit.
+            dt: Integration time step.
+            llm_state: Builds the world state for the LLM prompt, called only when a request
+                is submitted; None keeps rule-based movement only.
+        Returns:
+            np.ndarray: Slot indices of the cells born during this step.
+        """
+        n = len(self)
+        live = np.empty(n, dtype=np.bool_)
+        spawn = np.empty(n, dtype=np.bool_)
+        food_xy = np.array([food.position for food in foods if food.energy > 0], dtype=np.float64).reshape(-1, 2)
+        closest = spatial.nearest(np.column_stack((self.x, self.y)), food_xy)
+        # All of the step's per-cell draws in two bulk calls: heading change,
+        # speed factor and reproduction roll; then the OU noise
+        uniform = self.rng.random((3, n))
+        uniform[0] *= _TURN_SPAN
+        uniform[0] -= _MAX_TURN
+        uniform[1] *= 0.2
+        uniform[1] += 0.9
+        gauss = self.rng.standard_normal((2, n), dtype=np.float32)
+
+        columns = (self.age, self.energy, self.x, self.y, self.vx, self.vy, self.ax, self.ay)
+        shared = self._shared_params
+        if shared is not None:
+            kernel = kernels.specialized_step(shared, float(dt))
+            kernel(*columns, live, spawn, food_xy, closest, uniform, gauss)
+        else:
+            kernels.step(*columns, self.basal_metabolism, self.move_cost_per_unit, self.max_age,
+                         self.accel_sigma, self.accel_tau, self.vel_damping,
+                         self.reproduction_energy_threshold, self.reproduction_age_threshold,
+                         self.reproduction_probability, live, spawn, food_xy, closest, uniform, gauss, float(dt))
+        if llm_state is not None:
+            self._move_llm(llm_state, live)
+        return self.reproduce(spawn, max_cells)
+
+    def reproduce(self, can_reproduce: np.ndarray, max_cells: int) -> np.ndarray:
+        """
+        Split the cells flagged in `can_reproduce` (living, past both thresholds and
+        won their reproduction roll); offspring are dropped if they would exceed `max_cells`.
+        """
+        n = len(self)
+        parents = np.flatnonzero(can_reproduce)
+        if parents.size == 0:
+            return parents
+
+        fraction = 0.5
+        child_energy = self.energy[parents] * fraction
+        energy = self.energy[parents] - (child_energy + 2.0)
+        survived = energy > 0.0
+        self.energy[parents] = energy * survived
+        parents, child_energy = parents[survived], child_energy[survived]
+
+        k = parents.size
+        if k == 0 or n + k > max_cells:
+            return np.empty(0, dtype=np.intp)
+
+        angle = self.rng.uniform(0, _TWO_PI, k)
+        jitter = self.rng.uniform(-25.0, 25.0, (2, k))
+        offset = self.energy[parents] / 2
+
+        # Color mutation: with probability color_mutation_rate the green channel
+        # moves by up to ±color_mutation_strength (clipped to [0, 1])
+        colors = self.color[parents]
+        roll, delta = self.rng.random((2, k))
+        mutate = roll <= self.color_mutation_rate[parents]
+        delta = (2.0 * delta[mutate] - 1.0) * self.color_mutation_strength[parents][mutate]
+        colors[mutate, 1] = np.clip(colors[mutate, 1] + delta, 0.0, 1.0)
+
+        self._append(
+            np.fromiter(new_cell_ids(k), dtype=np.int64, count=k),
+            energy=child_energy,
+            x=self.x[parents] + offset + jitter[0],
+            y=self.y[parents] + offset + jitter[1],
+            vx=np.cos(angle) * 0.3,
+            vy=np.sin(angle) * 0.3,
+            ax=np.zeros(k),
+            ay=np.zeros(k),
+            age=np.zeros(k, dtype=np.int64),
+            color=colors,
+            **{name: getattr(self, name)[parents] for name in _PARAM_FIELDS},
+        )
+        return np.arange(n, n + k)
+
+    def apply_bounds(self, width: float, height: float, mode: str = "bounce", restitution: float = 0.8) -> None:
+        """Keep cells inside bounds by bouncing or wrapping and update velocity if bouncing."""
+        for pos, vel, limit in (("x", "vx", width), ("y", "vy", height)):
+            p, v = getattr(self, pos), getattr(self, vel)
+            low, high = p < 0.0, p > limit
+            if mode == "wrap":
+                p[low] += limit
+                p[high] -= limit
+                continue
+            v[low] = np.abs(v[low]) * restitution
+            v[high] = -np.abs(v[high]) * restitution
+            np.clip(p, 0.0, limit, out=p)
+
+    def remove_dead(self) -> None:
+        """Compact every column, dropping cells with no energy left."""
+        keep = self.energy > 0.0
+        if keep.all():
+            return
+        n, m = len(self), int(np.count_nonzero(keep))
+        for buffer in self._buffers.values():
+            buffer[:m] = buffer[:n][keep]
+        self._set_size(m)
+
+    def sort_spatially(self, cell_size: float) -> None:
+        """Reorder the slots by grid bucket so that cells close in space are close in memory."""
+        n = len(self)
+        order = SpatialGrid(np.column_stack((self.x, self.y)), cell_size).order
+        for buffer in self._buffers.values():
+            buffer[:n] = buffer[:n][order]
+
+    def _append(self, ids, color, **columns) -> None:
+        n, k = len(self), len(ids)
+        self._reserve(n + k)
+        columns.update(ids=ids, color=np.asarray(color, dtype=np.float64).reshape(-1, 3))
+        for name, buffer in self._buffers.items():
+            buffer[n:n + k] = columns[name]
+        self._set_size(n + k)
+
+    def _reserve(self, capacity: int) -> None:
+        """Grow every buffer (at least doubling) so it holds `capacity` rows."""
+        current = len(self._buffers["ids"])
+        if capacity <= current:
+            return
+        capacity = max(capacity, 2 * current)
+        for name, buffer in self._buffers.items():
+            grown = np.empty((capacity,) + buffer.shape[1:], dtype=buffer.dtype)
+            grown[:self._size] = buffer[:self._size]
+            self._buffers[name] = grown
+
+    def _set_size(self, n: int) -> None:
+        """Point every column attribute at the first `n` rows of its buffer."""
+        self._size = n
+        for name, buffer in self._buffers.items():
+            setattr(self, name, buffer[:n])
+
+    def close(self) -> None:
+        """Stop the LLM worker thread, if one was started; an in-flight request is abandoned."""
+        if self._llm_executor is not None:
+            self._llm_executor.shutdown(wait=False, cancel_futures=True)
+            self._llm_executor = None
+            self._llm_request = None
+
+    def _move_llm(self, llm_state: Callable[[], dict], live: np.ndarray) -> None:
+        """
+        Steer the living cells with the LLM without blocking the step: a single batched
+        request runs in the background (at most one every _LLM_REFRESH_STEPS steps) and
+        the latest reply is applied, by cell id, until the next one lands.
+        """
+        request = self._llm_request
+        if request is not None and request.done():
+            self._llm_request = None
+            try:
+                ids, moves = request.result()
+            except Exception as exc:
+                print(f"LLM movement request failed, keeping previous decisions: {exc}")
+            else:
+                self._llm_ids = ids
+                self._llm_velocity = np.array(moves, dtype=np.float64).reshape(-1, 2)
+
+        slots = np.flatnonzero(live)
+        if self._llm_request is None and self._llm_idle_steps >= _LLM_REFRESH_STEPS:
+            if self._llm_executor is None:
+                self._llm_executor = ThreadPoolExecutor(max_workers=1)
+            ids = self.ids[slots]
+            cell_states = [
+                {"id": cell_id, "energy": energy, "position": (x, y)}
+                for cell_id, energy, x, y in zip(
+                    ids.tolist(), self.energy[slots].tolist(), self.x[slots].tolist(), self.y[slots].tolist()
+                )
+            ]
+            world_state = llm_state()
+            self._llm_request = self._llm_executor.submit(
+                lambda: (ids, llm_batch_movement(world_state, cell_states)))
+            self._llm_idle_steps = 0
+        self._llm_idle_steps += 1
+
+        # Cells born after the last request keep their rule-based velocity
+        _, decided, reply = np.intersect1d(self.ids[slots], self._llm_ids, assume_unique=True, return_indices=True)
+        self.vx[slots[decided]], self.vy[slots[decided]] = self._llm_velocity[reply].T
@@ -4,16 +4,35 @@ import numpy as np
 import matplotlib
 import matplotlib.pyplot as plt
 from matplotlib.patches import Circle
+from matplotlib.collections import EllipseCollection
+from matplotlib.colors import to_rgba
 from matplotlib.animation import FFMpegWriter, PillowWriter
 
 from pathlib import Path
 from typing import Protocol, runtime_checkable, List, Sequence, Optional, Tuple
+import io
+import queue
+import subprocess
+import threading
 import time
 
-matplotlib.use("TkAgg")
-
 from entities import Food, Venom
-from cell import Cell
+from population import Population
+
+
+# Frames between two refreshes of the window title (cycle and population summary)
+_TITLE_EVERY = 50
+# Frames between refreshes of the on-screen status text
+_STATUS_EVERY = 10
+# Scatter-mode styles (RGBA, alpha folded in) of foods, venoms and cells; a cell's RGB is its own color
+_FOOD_FACE, _FOOD_EDGE = to_rgba("#3282bb", 0.8), to_rgba("#0d293b", 0.8)
+_VENOM_FACE, _VENOM_EDGE = to_rgba("#DD3131", 0.8), to_rgba("#421010", 0.8)
+_CELL_FACE, _CELL_EDGE = to_rgba("#000000", 0.85), to_rgba("#242b31", 0.85)
+# Rendered frames that may wait for ffmpeg before the oldest is dropped
+_FRAME_QUEUE_SIZE = 4
+# Per-frame GIF palettes: matplotlib's default graph (palettegen stats_mode=full) only
+# emits its palette at end of input, so ffmpeg would buffer every raw frame until then
+_GIF_FILTER = "split[a][b];[a]palettegen=stats_mode=single[p];[b][p]paletteuse=new=1"
 
 
 @runtime_checkable
@@ -22,7 +41,25 @@ class RenderableUniverse(Protocol):
     height: float
     foods: List[Food]
     venoms: List[Venom]
-    cells: List[Cell]
+    population: Population
+
+    def food_arrays(self) -> Tuple[np.ndarray, np.ndarray]: ...
+
+    def venom_arrays(self) -> Tuple[np.ndarray, np.ndarray]: ...
+
+    def render_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: ...
+
+
+class _FFMpegWriter(FFMpegWriter):
+    """
+    FFMpegWriter whose ffmpeg runs in its own session: Ctrl+C in the terminal
+    interrupts the simulation only, which then finishes the file itself.
+    """
+
+    def _run(self):
+        PIPE = subprocess.PIPE
+        self._proc = subprocess.Popen(
+            self._args(), stdin=PIPE, stdout=PIPE, stderr=PIPE, start_new_session=True)
 
 
 class VideoRecorder:
@@ -35,15 +72,21 @@ class VideoRecorder:
         quality: int = 5,  # 1-10, higher is better quality
         codec: str = "libx264",
         dpi: int = 100,
+        preset: str = "ultrafast",  # x264 speed/size trade-off: ultrafast ... medium ... veryslow
     ):
         self.output_path = Path(output_path)
         self.fps = fps
         self.quality = quality
         self.codec = codec
         self.dpi = dpi
+        self.preset = preset
         self.writer = None
         self.is_recording = False
         self.frame_count = 0
+        self.dropped_frames = 0
+        # ffmpeg only: rendered frames waiting to be piped by the background thread
+        self._frames: Optional[queue.Queue] = None
+        self._pipe_thread: Optional[threading.Thread] = None
         
         # Create output directory if it doesn't exist
         self.output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -55,15 +98,29 @@ class VideoRecorder:
             
         # Determine writer based on format
         if output_format.lower() in ["mp4", "avi", "mov"]:
-            self.writer = FFMpegWriter(
+            extra_args = ["-crf", str(31 - self.quality * 3)]  # CRF: 1-51, lower is better
+            if self.codec in ("libx264", "h264"):
+                # Live capture: fastest preset, no B-frame lookahead, a keyframe every 2 s,
+                # and 4:2:0 chroma so players other than ffplay can open the file
+                extra_args += [
+                    "-preset", self.preset,
+                    "-tune", "zerolatency",
+                    "-g", str(self.fps * 2),
+                    "-pix_fmt", "yuv420p",
+                ]
+            self.writer = _FFMpegWriter(
                 fps=self.fps,
                 codec=self.codec,
                 bitrate=-1,  # Auto bitrate
-                extra_args=["-crf", str(31 - self.quality * 3)]  # CRF: 1-51, lower is better
+                extra_args=extra_args,
             )
             output_file = self.output_path.with_suffix(f".{output_format}")
         elif output_format.lower() in ["gif"]:
-            self.writer = PillowWriter(fps=self.fps)
+            # ffmpeg streams each frame to disk; PillowWriter holds every frame in memory until finish()
+            if FFMpegWriter.isAvailable():
+                self.writer = _FFMpegWriter(fps=self.fps, extra_args=["-filter_complex", _GIF_FILTER])
+            else:
+                self.writer = PillowWriter(fps=self.fps)
             output_file = self.output_path.with_suffix(".gif")
         else:
             raise ValueError(f"Unsupported format: {output_format}")
@@ -71,20 +128,89 @@ class VideoRecorder:
         self.writer.setup(fig, str(output_file), dpi=self.dpi)
         self.is_recording = True
         self.frame_count = 0
+        self.dropped_frames = 0
+
+        # ffmpeg is fed from a background thread so a slow encoder does not stall
+        # the render loop; other writers grab their frames synchronously
+        if isinstance(self.writer, FFMpegWriter):
+            self._frames = queue.Queue(maxsize=_FRAME_QUEUE_SIZE)
+            self._pipe_thread = threading.Thread(target=self._pipe_frames, args=(self._frames,), daemon=True)
+            self._pipe_thread.start()
         print(f"Started recording: {output_file}")
+
+    def _pipe_frames(self, frames: queue.Queue) -> None:
+        """Write queued frames to ffmpeg's stdin until the None sentinel arrives."""
+        stdin = self.writer._proc.stdin
+        broken = False
+        while (frame := frames.get()) is not None:
+            if broken:
+                continue  # keep draining so stop_recording can post the sentinel
+            try:
+                stdin.write(frame)
+            except OSError:
+                broken = True  # ffmpeg exited; finish() reports its error
         
-    def capture_frame(self) -> None:
-        """Capture current frame"""
-        if self.is_recording and self.writer:
+    def capture_frame(self, drawn: bool = False) -> None:
+        """Capture current frame; `drawn` means the canvas buffer already holds it (e.g. just blitted)."""
+        if not (self.is_recording and self.writer):
+            return
+        if self._frames is None:
             self.writer.grab_frame()
             self.frame_count += 1
+            return
+
+        # Rendering stays on this thread (matplotlib is not thread-safe); only the pipe write is offloaded
+        frame = self._canvas_frame(drawn)
+        if frame is None:
+            buffer = io.BytesIO()
+            self.writer.fig.savefig(buffer, format=self.writer.frame_format, dpi=self.writer.dpi)
+            frame = buffer.getvalue()
+        try:
+            self._frames.put_nowait(frame)
+        except queue.Full:
+            # ffmpeg is behind: drop the oldest waiting frame rather than block
+            try:
+                self._frames.get_nowait()
+                self.dropped_frames += 1
+            except queue.Empty:
+                pass
+            self._frames.put(frame)
+        self.frame_count += 1
             
+    def _canvas_frame(self, drawn: bool) -> Optional[bytes]:
+        """
+        The frame straight from the Agg canvas buffer, drawing the figure first unless
+        `drawn`; None when the buffer does not match the writer's frame (other dpi or
+        pixel format, HiDPI screens), so the caller falls back to savefig.
+        """
+        canvas = self.writer.fig.canvas
+        if self.writer.frame_format != "rgba" or not hasattr(canvas, "buffer_rgba"):
+            return None
+        if not drawn:
+            canvas.draw()
+        pixels = np.asarray(canvas.buffer_rgba())
+        width, height = self.writer.frame_size
+        if pixels.shape[:2] != (height, width):
+            return None
+        return pixels.tobytes()  # a copy: the next draw reuses the buffer
+
     def stop_recording(self) -> None:
         """Stop recording and finalize video"""
         if self.is_recording and self.writer:
-            self.writer.finish()
+            if self._pipe_thread is not None:
+                self._frames.put(None)
+                self._pipe_thread.join()
+                self._frames = self._pipe_thread = None
             self.is_recording = False
-            print(f"Recording stopped. Saved {self.frame_count} frames.")
+            try:
+                self.writer.finish()
+            except subprocess.CalledProcessError as exc:
+                # matplotlib has already logged ffmpeg's stderr
+                print(f"Recording failed: ffmpeg exited with status {exc.returncode}")
+                return
+            saved = self.frame_count - self.dropped_frames
+            dropped = f" ({self.dropped_frames} dropped)" if self.dropped_frames else ""
+            print(f"Recording stopped. Saved {saved} frames{dropped}.")
             
     @property
     def recording_status(self) -> str:
@@ -108,6 +234,7 @@ class Renderer:
         recording_path: str = "simulation",
         recording_fps: int = 30,
         recording_quality: int = 8,
+        recording_preset: str = "ultrafast",
     ):
         self.fig = None
         self.ax = None
@@ -119,21 +246,28 @@ class Renderer:
         self.batch_size = batch_size
         self.frame_count = 0
         
-        # Scatter plot collections
-        self.food_scatter = None
-        self.venom_scatter = None
-        self.cell_scatter = None
-
-        # Patch collections for physical rendering
-        self.food_patches = []
-        self.venom_patches = [] 
-        self.cell_patches = []
+        # Circle collection holding every food, venom and cell, updated in place every frame
+        self.entity_scatter = None
+        # Circle patches (non-scatter mode), one pool per entity kind, reused across frames
+        self._food_patches: List[Circle] = []
+        self._venom_patches: List[Circle] = []
+        self._cell_patches: List[Circle] = []
+
+        # Static background (black axes) cached for blitting in scatter mode
+        self._background = None
+        # False with a non-interactive backend (Agg): nothing is shown, only recorded
+        self._interactive = False
+        # Simulation cycle shown by the last drawn frame
+        self._drawn_cycle = None
+        # (recording, refresh tick) of the current status text
+        self._status_key = None
         
         # Video recording
         self.recorder = VideoRecorder(
             output_path=recording_path,
             fps=recording_fps,
             quality=recording_quality,
+            preset=recording_preset,
         )
         self.recording_enabled = recording_enabled
         
@@ -154,6 +288,20 @@ class Renderer:
             # Toggle pause (implement if needed)
             pass
 
+    def _on_draw(self, event) -> None:
+        """Full redraws (first show, resize) refresh the blit background and redraw the moving artists."""
+        canvas = self.fig.canvas
+        if canvas.is_saving():
+            return
+        self._background = canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self) -> None:
+        """Draw the artists excluded from full redraws (entity collections, status) on top of the background."""
+        for artist in (self.entity_scatter, self.status_text):
+            if artist is not None:
+                self.ax.draw_artist(artist)
+
     def start_recording(self, output_format: str = "mp4") -> None:
         """Start video recording"""
         if self.fig and not self.recorder.is_recording:
@@ -167,16 +315,23 @@ class Renderer:
     def start(self, universe: RenderableUniverse, title: str = "Universe Live View") -> None:
         # Create figure with minimal elements
         self.fig, self.ax = plt.subplots(figsize=(12, 10))
-        self.fig.canvas.toolbar.pack_forget()
+        self._interactive = self.fig.canvas.required_interactive_framework is not None
+        if self.fig.canvas.toolbar is not None:
+            self.fig.canvas.toolbar.pack_forget()
+        self._title = title
+        if self.fig.canvas.manager is not None:
+            self.fig.canvas.manager.set_window_title(title)
 
         # Remove all axes, ticks, labels for clean look
         self.ax.set_xlim(0, universe.width)
         self.ax.set_ylim(0, universe.height)
         self.ax.set_axis_off()
         self.ax.set_facecolor('#000000')
+        # Fixed view: new artists never trigger a data-limit or autoscale pass
+        self.ax.set_autoscale_on(False)
+        self.ax.use_sticky_edges = False
         
-        # Remove padding and margins
-        self.fig.tight_layout(pad=0)
+        # Remove padding and margins (one fixed layout, no layout engine)
         self.fig.subplots_adjust(left=0, right=1, top=1, bottom=0)
         
         # Connect keyboard events
@@ -189,10 +344,18 @@ class Renderer:
             color='white', 
             fontsize=10,
             verticalalignment='top',
-            bbox=dict(boxstyle="round,pad=0.3", facecolor='black', alpha=0.7)
+            bbox=dict(boxstyle="round,pad=0.3", facecolor='black', alpha=0.7),
+            animated=self.use_scatter_plots,
         )
+
+        # Scatter mode blits: everything that changes per frame is animated and
+        # drawn over a cached background instead of redrawing the whole figure
+        if self.use_scatter_plots:
+            self.fig.canvas.mpl_connect('draw_event', self._on_draw)
         
-        plt.show(block=False)
+        if self._interactive:
+            plt.show(block=False)
+        self.fig.canvas.draw()
 
     def update(self, universe: RenderableUniverse, cycle_idx: int) -> None:
         start_time = time.time()
@@ -203,13 +366,13 @@ class Renderer:
         if self.frame_count % self.update_every_n_frames != 0:
             return
 
-        # Clear previous scatter plots
-        if self.food_scatter:
-            self.food_scatter.remove()
-        if self.venom_scatter:
-            self.venom_scatter.remove()
-        if self.cell_scatter:
-            self.cell_scatter.remove()
+        # Nothing to redraw if the simulation has not stepped since the last frame
+        # (recordings still get the frame, to keep their pacing)
+        if cycle_idx == self._drawn_cycle and not self.recorder.is_recording:
+            if self._interactive:
+                self.fig.canvas.flush_events()
+            return
+        self._drawn_cycle = cycle_idx
 
         # Use ultra-fast scatter plot rendering
         if self.use_scatter_plots:
@@ -217,31 +380,44 @@ class Renderer:
         else:
             self._render_with_circles(universe, cycle_idx)
 
-        # Update title and status
-        status_lines = [
-            f"Cycle: {cycle_idx}",
-            f"Cells: {len(universe.cells)} | Food: {len(universe.foods)} | Venom: {len(universe.venoms)}",
-            f"Recording: {self.recorder.recording_status}",
-            "Controls: [R]ecord [S]top [Q]uit"
-        ]
-        
-        if cycle_idx % 50 == 0:
-            self.ax.set_title(
-                f"Cycle {cycle_idx} | Cells: {len(universe.cells)} | Food: {len(universe.foods)} | Venom: {len(universe.venoms)}",
-                fontsize=10, color='white', pad=10
+        # The axes fill the whole figure, so the summary goes to the window title:
+        # no text layout or redraw, and only refreshed every few frames
+        if self.frame_count % _TITLE_EVERY == 0 and self.fig.canvas.manager is not None:
+            self.fig.canvas.manager.set_window_title(
+                f"{self._title} | Cycle {cycle_idx} | Cells: {len(universe.population)} | "
+                f"Food: {len(universe.foods)} | Venom: {len(universe.venoms)}"
             )
             
-        # Update status text
-        self.status_text.set_text('\n'.join(status_lines))
+        # Update status text every few frames, or at once when recording starts/stops
+        status_key = (self.recorder.is_recording, self.frame_count // _STATUS_EVERY)
+        if status_key != self._status_key:
+            self._status_key = status_key
+            status_lines = [
+                f"Cycle: {cycle_idx}",
+                f"Cells: {len(universe.population)} | Food: {len(universe.foods)} | Venom: {len(universe.venoms)}",
+                f"Recording: {self.recorder.recording_status}",
+                "Controls: [R]ecord [S]top [Q]uit"
+            ]
+            self.status_text.set_text('\n'.join(status_lines))
 
-        # Capture frame for recording
-        if self.recording_enabled and self.recorder.is_recording:
-            self.recorder.capture_frame()
+        # Ultra-fast drawing: blit the moving artists when possible, then pump the GUI
+        # event queue without sleeping (main.py paces the frames). Off-screen there
+        # is nothing to show; the recorder renders its own frames.
+        blitted = False
+        if self._interactive:
+            canvas = self.fig.canvas
+            if self.use_scatter_plots and self._background is not None:
+                canvas.restore_region(self._background)
+                self._draw_animated()
+                canvas.blit(self.fig.bbox)
+                blitted = True
+            else:
+                canvas.draw_idle()
+            canvas.flush_events()
 
-        # Ultra-fast drawing with minimal pause
-        self.fig.canvas.draw_idle()
-        self.fig.canvas.flush_events()
-        plt.pause(0.001)
+        # Capture frame for recording (a blitted frame is already in the canvas buffer)
+        if self.recording_enabled and self.recorder.is_recording:
+            self.recorder.capture_frame(drawn=blitted)
         
         # Track performance
         render_time = time.time() - start_time
@@ -250,104 +426,94 @@ class Renderer:
             self.render_times.pop(0)
 
     def _render_with_scatter(self, universe: RenderableUniverse, cycle_idx: int):
-        """Render using Circle patches at actual physical sizes."""
-        
-        # Clear previous patches
-        for patch in self.food_patches + self.venom_patches + self.cell_patches:
-            patch.remove()
-        self.food_patches.clear()
-        self.venom_patches.clear()
-        self.cell_patches.clear()
-
-        # Batch process foods - use ACTUAL diameters
-        for food in universe.foods:
-            if food.energy > 0:
-                circle = Circle(
-                    food.position,
-                    food.energy / 2.0,
-                    facecolor="#3282bb",
-                    edgecolor="#0d293b", 
-                    linewidth=2.0,
-                    alpha=0.8,
-                )
-                self.ax.add_patch(circle)
-                self.food_patches.append(circle)
-
-        # Batch process venoms - use ACTUAL diameters  
-        for venom in universe.venoms:
-            if venom.toxicity > 0:
-                circle = Circle(
-                    venom.position,
-                    venom.toxicity / 2.0,
-                    facecolor="#DD3131",
-                    edgecolor="#421010",
-                    linewidth=2,
-                    alpha=0.8,
-                )
-                self.ax.add_patch(circle)
-                self.venom_patches.append(circle)
-
-        # Batch process cells - use ACTUAL diameters
-        for cell in universe.cells:
-            if cell.energy > 0:
-                circle = Circle(
-                    cell.position,
-                    cell.diameter / 2.0,
-                    facecolor=cell.hex_color,
-                    edgecolor="#242b31",
-                    linewidth=3.0,
-                    alpha=0.85,
-                )
-                self.ax.add_patch(circle)
-                self.cell_patches.append(circle)
+        """Render every entity as one circle collection at actual physical sizes, updated in place."""
+        # Foods and venoms - use ACTUAL diameters
+        food_xy, food_energy = universe.food_arrays()
+        venom_xy, toxicity = universe.venom_arrays()
+        # Cells - use ACTUAL diameters
+        xs, ys, diameters, colors = universe.render_arrays()
+
+        # One draw for all kinds: per-circle styles, cells last so they sit above foods and venoms
+        counts = (len(food_energy), len(toxicity), len(diameters))
+        n_food, n_venom = counts[0], counts[1]
+        facecolors = np.repeat((_FOOD_FACE, _VENOM_FACE, _CELL_FACE), counts, axis=0)
+        facecolors[n_food + n_venom:, :3] = colors
+        self.entity_scatter = self._draw_circles(
+            self.entity_scatter,
+            np.concatenate((food_xy, venom_xy, np.column_stack((xs, ys)))),
+            np.concatenate((food_energy, toxicity, diameters)),
+            facecolors,
+            np.repeat((_FOOD_EDGE, _VENOM_EDGE, _CELL_EDGE), counts, axis=0),
+            np.repeat((2.0, 2.0, 3.0), counts),
+        )
+
+    def _draw_circles(self, collection, offsets, diameters, facecolors, edgecolors, linewidths) -> EllipseCollection:
+        """Create a circle collection (diameters in data units) on first use, then update it in place."""
+        if collection is None:
+            collection = EllipseCollection(
+                diameters,
+                diameters,
+                0.0,
+                units="xy",
+                offsets=offsets,
+                offset_transform=self.ax.transData,
+                facecolors=facecolors,
+                edgecolors=edgecolors,
+                linewidths=linewidths,
+                animated=True,
+            )
+            self.ax.add_collection(collection, autolim=False)
+            return collection
+        collection.set_offsets(offsets)
+        collection.set_widths(diameters)
+        collection.set_heights(diameters)
+        collection.set_facecolor(facecolors)
+        collection.set_edgecolor(edgecolors)
+        collection.set_linewidth(linewidths)
+        return collection
 
     def _render_with_circles(self, universe: RenderableUniverse, cycle_idx: int):
-        """Slower but higher quality rendering with Circle patches."""
-        batch_count = 0
-        
+        """Slower but higher quality rendering with Circle patches (at most batch_size per kind)."""
         # Food circles
-        for food in universe.foods:
-            if food.energy > 0 and batch_count < self.batch_size:
-                circle = Circle(
-                    food.position,
-                    food.energy / 2.0,
-                    facecolor="#3282bb",
-                    edgecolor="#0d293b",
-                    linewidth=1.0,
-                    alpha=0.8,
-                )
-                self.ax.add_patch(circle)
-                batch_count += 1
-
-        batch_count = 0
+        food_xy, food_energy = universe.food_arrays()
+        self._update_patches(
+            self._food_patches, food_xy, food_energy, "#3282bb",
+            edgecolor="#0d293b", linewidth=1.0, alpha=0.8,
+        )
+
         # Venom circles
-        for venom in universe.venoms:
-            if venom.toxicity > 0 and batch_count < self.batch_size:
-                circle = Circle(
-                    venom.position,
-                    venom.toxicity / 2.0,
-                    facecolor="#7c1d1d",
-                    edgecolor="#2b0c09",
-                    linewidth=2.0,
-                    alpha=0.9,
-                )
-                self.ax.add_patch(circle)
-                batch_count += 1
-
-        batch_count = 0
+        venom_xy, toxicity = universe.venom_arrays()
+        self._update_patches(
+            self._venom_patches, venom_xy, toxicity, "#7c1d1d",
+            edgecolor="#2b0c09", linewidth=2.0, alpha=0.9,
+        )
+
         # Cell circles
-        for cell in universe.cells:
-            if cell.energy > 0 and batch_count < self.batch_size:
-                circle = Circle(
-                    cell.position,
-                    cell.diameter / 2.0,
-                    facecolor=cell.hex_color,
-                    edgecolor='#2c3e50',
-                    linewidth=1.0,
-                    alpha=0.85,
-                )
-                self.ax.add_patch(circle)
-                batch_count += 1
+        xs, ys, diameters, colors = universe.render_arrays()
+        self._update_patches(
+            self._cell_patches, np.column_stack((xs, ys)), diameters, colors,
+            edgecolor='#2c3e50', linewidth=1.0, alpha=0.85,
+        )
+
+    def _update_patches(self, pool: List[Circle], centers, diameters, facecolors, **style) -> None:
+        """Move the pooled circles onto the given entities, growing the pool as needed; surplus circles are hidden."""
+        count = min(len(diameters), self.batch_size)
+        per_patch_colors = not isinstance(facecolors, str)
+        if per_patch_colors:
+            facecolors = facecolors[:count].tolist()
+        for i, ((x, y), diameter) in enumerate(zip(centers[:count].tolist(), diameters[:count].tolist())):
+            color = facecolors[i] if per_patch_colors else facecolors
+            if i == len(pool):
+                pool.append(self.ax.add_patch(Circle((x, y), diameter / 2.0, facecolor=color, **style)))
+                continue
+            circle = pool[i]
+            circle.set_center((x, y))
+            circle.set_radius(diameter / 2.0)
+            if per_patch_colors:
+                circle.set_facecolor(color)
+            circle.set_visible(True)
+        for circle in pool[count:]:
+            circle.set_visible(False)
 
     @property
     def stopped(self) -> bool:
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import math
+from typing import Tuple
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; nearest() falls back to scipy or NumPy
+    njit = None
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy is optional; only used by nearest() when numba is missing
+    cKDTree = None
+
+
+# Offsets of the 3x3 bucket neighbourhood
+_NEIGHBOURS = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+
+# Up to this many points a dense scan is cheaper than bucketing them
+_DENSE_POINTS = 64
+
+
+def _bucket_keys(gx: np.ndarray, gy: np.ndarray) -> np.ndarray:
+    """Pack integer grid coordinates into a single sortable int64 key."""
+    return (gx << 32) + gy
+
+
+class SpatialGrid:
+    """
+    Uniform grid over a set of points, rebuilt from coordinate arrays:
+      A) Points are bucketed by (x // cell_size, y // cell_size)
+      B) Indices are sorted by bucket so every bucket is a contiguous run
+      C) Queries gather the 3x3 buckets around each query point at once
+
+    Anything within `cell_size` of a query point is guaranteed to be returned.
+    """
+
+    def __init__(self, xy: np.ndarray, cell_size: float):
+        self.cell_size = float(cell_size)
+        gx, gy = self._grid_coords(xy)
+        keys = _bucket_keys(gx, gy)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def __len__(self) -> int:
+        """Number of occupied buckets."""
+        return int(np.count_nonzero(np.diff(self.keys))) + 1 if self.keys.size else 0
+
+    def candidates(self, xy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Pairs (query index, point index) for every point in the 3x3 buckets around each query."""
+        gx, gy = self._grid_coords(xy)
+        queries, points = [], []
+        for dx, dy in _NEIGHBOURS:
+            keys = _bucket_keys(gx + dx, gy + dy)
+            lo = np.searchsorted(self.keys, keys, side="left")
+            counts = np.searchsorted(self.keys, keys, side="right") - lo
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            # Expand each [lo, lo + count) run into individual sorted positions
+            run_start = np.repeat(np.cumsum(counts) - counts, counts)
+            positions = np.repeat(lo, counts) + (np.arange(total) - run_start)
+            queries.append(np.repeat(np.arange(len(xy)), counts))
+            points.append(self.order[positions])
+
+        if not queries:
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty
+        return np.concatenate(queries), np.concatenate(points)
+
+    def _grid_coords(self, xy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        g = np.floor(np.asarray(xy, dtype=np.float64).reshape(-1, 2) / self.cell_size).astype(np.int64)
+        return g[:, 0], g[:, 1]
+
+
+def touching_pairs(
+    xy: np.ndarray, radius: np.ndarray, other_xy: np.ndarray, other_radius: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Index pairs (i, j) whose circles overlap: |xy[i] - other_xy[j]| <= radius[i] + other_radius[j]."""
+    if len(xy) == 0 or len(other_xy) == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+
+    # Bucket size = largest possible reach, so touching pairs are always neighbours
+    max_reach = float(radius.max() + other_radius.max())
+    grid = SpatialGrid(other_xy, max(max_reach, 1.0))
+    i, j = grid.candidates(xy)
+
+    d = xy[i] - other_xy[j]
+    reach = radius[i] + other_radius[j]
+    hit = np.einsum("ij,ij->i", d, d) <= reach * reach
+    return i[hit], j[hit]
+
+
+def nearest(xy: np.ndarray, other_xy: np.ndarray) -> np.ndarray:
+    """Index of the closest point of `other_xy` to each point of `xy` (-1 when `other_xy` is empty)."""
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    other_xy = np.asarray(other_xy, dtype=np.float64).reshape(-1, 2)
+    if len(xy) == 0 or len(other_xy) == 0:
+        return np.full(len(xy), -1, dtype=np.intp)
+    if njit is None and cKDTree is not None:
+        # Without numba one k-d tree query in C beats both NumPy paths at any size
+        return cKDTree(other_xy).query(xy, k=1, workers=-1)[1]
+    if len(other_xy) <= _DENSE_POINTS:
+        return _nearest_dense(xy, other_xy)
+
+    # Buckets sized for roughly one point each over the points' bounding square
+    extent = float((other_xy.max(axis=0) - other_xy.min(axis=0)).max())
+    grid = SpatialGrid(other_xy, max(extent / math.sqrt(len(other_xy)), 1.0))
+    if njit is None:
+        return _nearest_numpy(grid, xy, other_xy)
+
+    # Dense CSR over the occupied bounding box: bucket b holds order[starts[b]:starts[b + 1]]
+    gx, gy = grid._grid_coords(other_xy)
+    gx_lo, gy_lo = gx.min(), gy.min()
+    width, height = gx.max() - gx_lo + 1, gy.max() - gy_lo + 1
+    box = _bucket_keys(np.arange(gx_lo, gx_lo + width)[:, None], np.arange(gy_lo, gy_lo + height)[None, :])
+    starts = np.append(np.searchsorted(grid.keys, box.ravel()), len(grid.keys))
+    closest = np.empty(len(xy), dtype=np.intp)
+    _nearest_rings(xy, other_xy, grid.order, starts, grid.cell_size, gx_lo, gy_lo, width, height, closest)
+    return closest
+
+
+def _nearest_dense_numpy(xy: np.ndarray, other_xy: np.ndarray) -> np.ndarray:
+    d = other_xy[None, :, :] - xy[:, None, :]
+    return np.argmin(np.einsum("ijk,ijk->ij", d, d), axis=1)
+
+
+def _nearest_numpy(grid: SpatialGrid, xy: np.ndarray, other_xy: np.ndarray) -> np.ndarray:
+    i, j = grid.candidates(xy)
+    d = xy[i] - other_xy[j]
+    dist2 = np.einsum("ij,ij->i", d, d)
+
+    # Closest candidate per query (lowest index on ties)
+    order = np.lexsort((j, dist2, i))
+    i, j, dist2 = i[order], j[order], dist2[order]
+    first = np.flatnonzero(np.diff(i, prepend=-1))
+    closest = np.full(len(xy), -1, dtype=np.intp)
+    best = np.full(len(xy), np.inf)
+    closest[i[first]], best[i[first]] = j[first], dist2[first]
+
+    # The 3x3 neighbourhood is only exhaustive within one bucket; scan everything for the rest
+    far = np.flatnonzero(best > grid.cell_size * grid.cell_size)
+    if far.size:
+        closest[far] = _nearest_dense_numpy(xy[far], other_xy)
+    return closest
+
+
+if njit is not None:
+
+    @njit(parallel=True, cache=True)
+    def _nearest_dense(xy, other_xy):
+        closest = np.empty(xy.shape[0], dtype=np.intp)
+        for i in prange(xy.shape[0]):
+            best, best_j = np.inf, -1
+            for j in range(other_xy.shape[0]):
+                dx = other_xy[j, 0] - xy[i, 0]
+                dy = other_xy[j, 1] - xy[i, 1]
+                d2 = dx * dx + dy * dy
+                if d2 < best:
+                    best, best_j = d2, j
+            closest[i] = best_j
+        return closest
+
+    @njit(parallel=True, cache=True)
+    def _nearest_rings(xy, other_xy, order, starts, cell_size, gx_lo, gy_lo, width, height, closest) -> None:
+        """Search square rings of buckets outwards until no unvisited bucket can hold a closer point."""
+        for i in prange(xy.shape[0]):
+            px, py = xy[i, 0], xy[i, 1]
+            # Bucket of the query relative to the bounding box (may lie outside it)
+            cx = np.int64(math.floor(px / cell_size)) - gx_lo
+            cy = np.int64(math.floor(py / cell_size)) - gy_lo
+            # Rings inside the gap to the bounding box are empty
+            r = max(0, -cx, cx - (width - 1), -cy, cy - (height - 1))
+            r_max = max(cx, width - 1 - cx, cy, height - 1 - cy)
+            best, best_j = np.inf, -1
+            while r <= r_max:
+                for bx in range(max(cx - r, 0), min(cx + r, width - 1) + 1):
+                    # Full columns on the ring's edges, only top and bottom in between
+                    if bx == cx - r or bx == cx + r:
+                        rows = range(max(cy - r, 0), min(cy + r, height - 1) + 1)
+                    else:
+                        rows = range(cy - r, cy + r + 1, 2 * r)
+                    for by in rows:
+                        if by < 0 or by >= height:
+                            continue
+                        b = bx * height + by
+                        for s in range(starts[b], starts[b + 1]):
+                            j = order[s]
+                            dx = other_xy[j, 0] - px
+                            dy = other_xy[j, 1] - py
+                            d2 = dx * dx + dy * dy
+                            if d2 < best or (d2 == best and j < best_j):
+                                best, best_j = d2, j
+                # Every bucket beyond ring r is at least r buckets away
+                reach = r * cell_size
+                if best < reach * reach:
+                    break
+                r += 1
+            closest[i] = best_j
+
+else:
+    _nearest_dense = _nearest_dense_numpy
@@ -2,13 +2,18 @@ from __future__ import annotations
 
 import json
 import random
-from uuid import uuid4
-from typing import List, Tuple, Dict, Any, Optional, DefaultDict
-from collections import defaultdict
+from typing import List, Tuple, Dict, Any, Optional
 
-from entities import Food, Venom
+import numpy as np
+
+from entities import Food, Venom, new_entity_id
 from cell import Cell
-from tools import distance_to
+from population import Population
+from spatial import SpatialGrid, touching_pairs
+
+
+# Ticks between two re-sorts of the population by grid bucket
+_SPATIAL_SORT_EVERY = 32
 
 
 class Universe:
@@ -44,6 +49,9 @@ class Universe:
         # cell boundary handling
         boundary_mode: str = "bounce",
         bounce_restitution: float = 0.8,
+
+        # steer cells with batched LLM requests on top of the rule-based movement
+        llm_movement: bool = False,
     ):
         assert 0.0 <= ratio <= 1.0, "ratio must be in [0, 1]"
         assert width > 0 and height > 0, "Universe dimensions must be positive"
@@ -58,6 +66,7 @@ class Universe:
         self.max_cells = max_cells
         self.cell_check_radius = cell_check_radius
         self.cell_check_radius2 = cell_check_radius * cell_check_radius
+        self.llm_movement = llm_movement
 
         # energy pipeline
         self.energy = initial_energy
@@ -79,23 +88,53 @@ class Universe:
         # state
         self.foods: List[Food] = []
         self.venoms: List[Venom] = []
-        self.cells: List[Cell] = []
+        self.population = Population()
+        self._cycle_count = 0
 
-        # Spatial partitioning for performance
-        self._spatial_grid: DefaultDict[Tuple[int, int], List[Cell]] = defaultdict(list)
-        self._grid_cell_size = 100.0  # Size of each grid cell
+        # Bucket size of the spatial grid used to keep the population sorted by position
+        self._grid_cell_size = max(100.0, cell_check_radius)
 
     @property
     def state(self) -> dict[str, Any]:
         """Broadcast minimal state for high-frequency updates (e.g., rendering)."""
         return {
-            "cells": [cell.state for cell in self.cells if cell.energy > 0],
+            "cells": self.population.state_view(),
             "foods": [food.state for food in self.foods if food.energy > 0],
             "venoms": [venom.state for venom in self.venoms if venom.toxicity > 0],
         }
 
+    def _llm_state(self) -> dict[str, Any]:
+        """Foods and venoms for the LLM movement prompt; the cells are listed separately by Population."""
+        return {
+            "foods": [food.state for food in self.foods if food.energy > 0],
+            "venoms": [venom.state for venom in self.venoms if venom.toxicity > 0],
+        }
+
+    def food_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(xy, energy) of the non-depleted foods: an (M, 2) position array and the energies."""
+        foods = [food for food in self.foods if food.energy > 0]
+        xy = np.array([food.position for food in foods], dtype=np.float64).reshape(-1, 2)
+        return xy, np.array([food.energy for food in foods], dtype=np.float64)
+
+    def venom_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(xy, toxicity) of the non-depleted venoms: an (M, 2) position array and the toxicities."""
+        venoms = [venom for venom in self.venoms if venom.toxicity > 0]
+        xy = np.array([venom.position for venom in venoms], dtype=np.float64).reshape(-1, 2)
+        return xy, np.array([venom.toxicity for venom in venoms], dtype=np.float64)
+
+    def render_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(xs, ys, diameters, colors) of the living cells; colors is an (N, 3) RGB array."""
+        pop = self.population
+        alive = pop.energy > 0.0
+        return pop.x[alive], pop.y[alive], pop.energy[alive], pop.color[alive]
+
+    @property
+    def cells(self) -> List[Cell]:
+        """Cell views of the population (snapshots, rebuilt on every access)."""
+        return self.population.cells()
+
     def add_cell(self, agent: Cell) -> None:
-        self.cells.append(agent)
+        self.population.add(agent)
 
     def add_food(self, food: Food) -> None:
         self.foods.append(food)
@@ -105,39 +144,20 @@ class Universe:
 
     def run(self, input_energy: float, cycle_count: int) -> tuple[List[Food], List[Venom], List[Cell]]:
         """Optimized simulation step with spatial partitioning."""
-        
-        # Only update spatial grid every few cycles for performance
-        if cycle_count % 5 == 0:
-            self._update_spatial_grid()
-            
-        offspring: List[Cell] = []
+
         foods_created: List[Food] = []
         venoms_created: List[Venom] = []
-        
-        # Process cells with performance optimization
-        cell_count = len(self.cells)
-        if cell_count > self.max_cells * 0.8:
-            # Slow down when approaching limit
-            process_every_n = max(1, cell_count // (self.max_cells // 2))
-        else:
-            process_every_n = 1
-
-        for i, cell in enumerate(list(self.cells)):
-            if i % process_every_n == 0:  # Skip some cells when population is high
-                child = cell.run(self.state)
-                self._apply_bounds(cell)
-                self._interact_partial(cell)
-                if child is not None and len(self.cells) < self.max_cells:
-                    self._apply_bounds(child)
-                    self._interact_partial(child)
-                    offspring.append(child)
-
-        # Add offspring if under limit
-        if offspring and len(self.cells) + len(offspring) <= self.max_cells:
-            self.cells.extend(offspring)
+        self._cycle_count = cycle_count
+
+        # Vectorized step over the whole population (offspring only if under limit)
+        llm_state = self._llm_state if self.llm_movement else None
+        born = self.population.step(self.foods, self.max_cells, llm_state=llm_state)
+        self._apply_bounds()
+        self._interact()
+        offspring = [self.population.cell(i) for i in born.tolist()]
 
         # Add resources every 50 cycles
-        if cycle_count % 50 == 0 and len(self.cells) < self.max_cells:
+        if cycle_count % 50 == 0 and len(self.population) < self.max_cells:
             usable = input_energy * self.waste_factor * random.uniform(0.8, 0.99)
             ef = usable * self.ratio
             ev = usable * (1.0 - self.ratio)
@@ -145,15 +165,19 @@ class Universe:
             venoms_created = self._create_venoms(self._random_partition(ev, self.min_unit_venom, self.max_new_venoms))
             self.energy += input_energy
 
-        # Cleanup
+        # Cleanup (degrade_all already drops depleted foods and venoms)
         self.degrade_all()
         if self.cleanup_depleted:
-            self.cells = [c for c in self.cells if c.energy > 0.0]
-            self.foods = [f for f in self.foods if f.energy > 0.0]
-            self.venoms = [v for v in self.venoms if v.toxicity > 0.0]
+            self.population.remove_dead()
+        if cycle_count % _SPATIAL_SORT_EVERY == 0:
+            self.population.sort_spatially(self._grid_cell_size)
 
         return foods_created, venoms_created, offspring
 
+    def close(self) -> None:
+        """Release background resources (the population's LLM worker thread)."""
+        self.population.close()
+
     def degrade_all(self) -> None:
         for f in self.foods:
             f.degrade(self.food_degrade_factor)
@@ -166,132 +190,109 @@ class Universe:
 
     def _state_full(self) -> dict[str, Any]:
         """Broadcast the complete state of the universe using each entity's _state method."""
-        alive_cells = [cell for cell in self.cells if cell.energy > 0]
+        cells = self.population.state_view()
+        cell_energy, n_cells = cells["energy"], len(cells["id"])
         alive_foods = [food for food in self.foods if food.energy > 0]
         alive_venoms = [venom for venom in self.venoms if venom.toxicity > 0]
+        grid = SpatialGrid(np.column_stack((cells["x"], cells["y"])), self._grid_cell_size)
         
         return {
             "universe": {
                 "width": self.width,
                 "height": self.height,
                 "total_energy": self.energy,
-                "cycle_count": getattr(self, '_cycle_count', 0),
+                "cycle_count": self._cycle_count,
                 "boundary_mode": self.boundary_mode,
                 "bounce_restitution": self.bounce_restitution,
             },
-            "cells": [cell.state for cell in alive_cells],
+            "cells": [
+                {"id": cell_id, "energy": energy, "position": (x, y)}
+                for cell_id, energy, x, y in zip(
+                    cells["id"].tolist(), cell_energy.tolist(), cells["x"].tolist(), cells["y"].tolist()
+                )
+            ],
             "foods": [food.state for food in alive_foods],
             "venoms": [venom.state for venom in alive_venoms],
             "statistics": {
-                "total_cells": len(alive_cells),
+                "total_cells": n_cells,
                 "total_foods": len(alive_foods),
                 "total_venoms": len(alive_venoms),
-                "average_cell_energy": (
-                    sum(cell.energy for cell in alive_cells) / max(1, len(alive_cells))
-                ),
-                "average_cell_age": (
-                    sum(cell.age for cell in alive_cells) / max(1, len(alive_cells))
-                ),
-                "total_cell_energy": sum(cell.energy for cell in alive_cells),
+                "average_cell_energy": float(cell_energy.sum()) / max(1, n_cells),
+                "average_cell_age": float(cells["age"].sum()) / max(1, n_cells),
+                "total_cell_energy": float(cell_energy.sum()),
                 "total_food_energy": sum(food.energy for food in alive_foods),
                 "total_venom_toxicity": sum(venom.toxicity for venom in alive_venoms),
             },
             "spatial_info": {
                 "grid_cell_size": self._grid_cell_size,
                 "cell_check_radius": self.cell_check_radius,
-                "grid_occupancy": len(self._spatial_grid),
+                "grid_occupancy": len(grid),
             }
         }
     
     def to_json(self) -> str:
-        return json.dumps(self.get_state(), indent=2)
-
-    def _apply_bounds(self, cell: Cell) -> None:
-        """Keep a cell inside bounds by bouncing or wrapping and update velocity if bouncing."""
-        x, y = cell.position
-        vx = getattr(cell, "vx", 0.0)
-        vy = getattr(cell, "vy", 0.0)
-
-        if self.boundary_mode == "wrap":
-            if x < 0.0:
-                x += self.width
-            elif x > self.width:
-                x -= self.width
-
-            if y < 0.0:
-                y += self.height
-            elif y > self.height:
-                y -= self.height
-
-        else:
-            if x < 0.0:
-                x = 0.0
-                vx = abs(vx) * self.bounce_restitution
-            elif x > self.width:
-                x = self.width
-                vx = -abs(vx) * self.bounce_restitution
-
-            if y < 0.0:
-                y = 0.0
-                vy = abs(vy) * self.bounce_restitution
-            elif y > self.height:
-                y = self.height
-                vy = -abs(vy) * self.bounce_restitution
-
-        cell.position = (x, y)
-        if hasattr(cell, "vx"): cell.vx = vx
-        if hasattr(cell, "vy"): cell.vy = vy
-
-    def _interact_partial(self, cell: Cell) -> None:
-        """Optimized interaction checking only nearby objects."""
-        if cell.energy <= 0.0:
+        return json.dumps(self._state_full(), indent=2)
+
+    def _apply_bounds(self) -> None:
+        """Keep cells inside bounds by bouncing or wrapping and update velocity if bouncing."""
+        self.population.apply_bounds(self.width, self.height, self.boundary_mode, self.bounce_restitution)
+
+    def _interact(self) -> None:
+        """Touch interactions between every living cell and the foods/venoms it overlaps."""
+        pop = self.population
+        live = np.flatnonzero(pop.energy > 0.0)
+        if live.size == 0:
             return
 
-        # Get nearby objects
-        nearby_foods = self._get_nearby_foods(cell.position)
-        nearby_venoms = self._get_nearby_venoms(cell.position)
-        
-        cell_radius = cell.diameter / 2.0
+        energy = pop.energy[live]
+        cell_xy = np.column_stack((pop.x[live], pop.y[live]))
+        cell_radius = energy / 2.0
 
         # Food interactions
-        for food in nearby_foods:
-            if food.energy > 0:
-                distance = distance_to(cell.position, food.position)
-                food_radius = food.energy / 2.0
-                
-                if distance <= (cell_radius + food_radius):
-                    # Eating logic
-                    cell_size_factor = min(cell.energy / (food.energy + 0.1), 2.0)
-                    base_eat_rate = 0.1
-                    eat_rate = base_eat_rate * cell_size_factor
-                    
-                    amt = min(food.energy * eat_rate, food.energy)
-                    food.energy -= amt
-                    cell.energy += amt
-                    
-                    if food.energy <= 0.01:
-                        food.energy = 0.0
+        foods = [food for food in self.foods if food.energy > 0]
+        if foods:
+            food_energy = np.array([food.energy for food in foods])
+            food_xy = np.array([food.position for food in foods], dtype=np.float64)
+            ci, fi = touching_pairs(cell_xy, cell_radius, food_xy, food_energy / 2.0)
+
+            # Eating logic
+            cell_size_factor = np.minimum(energy[ci] / (food_energy[fi] + 0.1), 2.0)
+            base_eat_rate = 0.1
+            eat_rate = base_eat_rate * cell_size_factor
+            amt = np.minimum(food_energy[fi] * eat_rate, food_energy[fi])
+
+            # Several cells on one food share it rather than eating more than it holds
+            eaten = np.bincount(fi, amt, minlength=len(foods))
+            share = np.divide(food_energy, eaten, out=np.ones_like(food_energy), where=eaten > food_energy)
+            amt *= share[fi]
+
+            np.add.at(energy, ci, amt)
+            food_energy -= np.bincount(fi, amt, minlength=len(foods))
+            food_energy *= food_energy > 0.01
+            for food, food_e in zip(foods, food_energy.tolist()):
+                food.energy = food_e
 
         # Venom interactions
-        for venom in nearby_venoms:
-            if venom.toxicity > 0:
-                distance = distance_to(cell.position, venom.position)
-                venom_radius = venom.toxicity / 2.0
-                
-                if distance <= (cell_radius + venom_radius):
-                    # Poisoning logic
-                    venom_potency = venom.toxicity / (cell.energy + 0.1)
-                    base_poison_rate = 0.09
-                    poison_rate = base_poison_rate * venom_potency
-                    
-                    dmg = min(venom.toxicity * poison_rate, venom.toxicity)
-                    venom.toxicity -= dmg * 0.4
-                    cell.energy -= dmg
-                    
-                    if venom.toxicity <= 0.01:
-                        venom.toxicity = 0.0
-                    if cell.energy <= 0.0:
-                        cell.energy = 0.0
+        venoms = [venom for venom in self.venoms if venom.toxicity > 0]
+        if venoms:
+            toxicity = np.array([venom.toxicity for venom in venoms])
+            venom_xy = np.array([venom.position for venom in venoms], dtype=np.float64)
+            ci, vi = touching_pairs(cell_xy, cell_radius, venom_xy, toxicity / 2.0)
+
+            # Poisoning logic
+            venom_potency = toxicity[vi] / (energy[ci] + 0.1)
+            base_poison_rate = 0.09
+            poison_rate = base_poison_rate * venom_potency
+            dmg = np.minimum(toxicity[vi] * poison_rate, toxicity[vi])
+
+            np.subtract.at(energy, ci, dmg)
+            np.maximum(energy, 0.0, out=energy)
+            toxicity = np.maximum(toxicity - np.bincount(vi, dmg * 0.4, minlength=len(venoms)), 0.0)
+            toxicity *= toxicity > 0.01
+            for venom, tox in zip(venoms, toxicity.tolist()):
+                venom.toxicity = tox
+
+        pop.energy[live] = energy
 
     def _random_partition(self, total: float, min_unit: float, max_parts_cap: int) -> List[float]:
         """Randomly split 'total' into N parts >= min_unit, with N <= max_parts_cap."""
@@ -326,63 +327,15 @@ class Universe:
         return (random.uniform(0.0, self.width), random.uniform(0.0, self.height))
 
     def _create_foods(self, energy_chunks: List[float]) -> List[Food]:
-        foods = [Food(id=uuid4(), energy=e, position=self._rand_position())
+        foods = [Food(id=new_entity_id(), energy=e, position=self._rand_position())
                  for e in energy_chunks]
         self.foods.extend(foods)
         return foods
 
     def _create_venoms(self, energy_chunks: List[float]) -> List[Venom]:
-        venoms = [Venom(id=uuid4(),
+        venoms = [Venom(id=new_entity_id(),
                         toxicity=e * self.venom_energy_to_toxicity,
                         position=self._rand_position())
                   for e in energy_chunks]
         self.venoms.extend(venoms)
         return venoms
-
-    def _get_grid_key(self, position: Tuple[float, float]) -> Tuple[int, int]:
-        """Convert position to grid coordinates."""
-        x, y = position
-        grid_x = int(x // self._grid_cell_size)
-        grid_y = int(y // self._grid_cell_size)
-        return (grid_x, grid_y)
-
-    def _update_spatial_grid(self):
-        """Update the spatial partitioning grid."""
-        self._spatial_grid.clear()
-        for cell in self.cells:
-            if cell.energy > 0:
-                key = self._get_grid_key(cell.position)
-                self._spatial_grid[key].append(cell)
-
-    def _get_nearby_cells(self, position: Tuple[float, float]) -> List[Cell]:
-        """Get cells near a position using spatial partitioning."""
-        center_key = self._get_grid_key(position)
-        nearby_cells = []
-        
-        # Check 3x3 grid around the position
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                check_key = (center_key[0] + dx, center_key[1] + dy)
-                if check_key in self._spatial_grid:
-                    for cell in self._spatial_grid[check_key]:
-                        # Check actual distance
-                        if distance_to(position, cell.position) <= self.cell_check_radius2:
-                            nearby_cells.append(cell)
-        
-        return nearby_cells
-
-    def _get_nearby_foods(self, position: Tuple[float, float]) -> List[Food]:
-        """Get foods near a position."""
-        nearby_foods = []
-        for food in self.foods:
-            if food.energy > 0 and distance_to(position, food.position) <= self.cell_check_radius2:
-                nearby_foods.append(food)
-        return nearby_foods
-
-    def _get_nearby_venoms(self, position: Tuple[float, float]) -> List[Venom]:
-        """Get venoms near a position."""
-        nearby_venoms = []
-        for venom in self.venoms:
-            if venom.toxicity > 0 and distance_to(position, venom.position) <= self.cell_check_radius2:
-                nearby_venoms.append(venom)
-        return nearby_venoms
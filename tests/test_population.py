@@ -0,0 +1,46 @@
+import random
+
+import numpy as np
+import pytest
+
+import kernels
+from cell import Cell, CellParams, new_cell_id
+from entities import Food, new_entity_id
+from population import Population
+
+pytestmark = pytest.mark.skipif(kernels.njit is None, reason="numba is not installed")
+
+
+def seeded_run(mixed_params: bool, steps: int = 30) -> Population:
+    """A seeded population stepped `steps` times among a few foods."""
+    rnd = random.Random(7)
+    population = Population(seed=11)
+    for i in range(400):
+        speed = 1.0 + (i % 3) * 0.5 if mixed_params else 3.0
+        params = CellParams(speed=speed, reproduction_age_threshold=10, reproduction_probability=0.05)
+        population.add(Cell(id=new_cell_id(), energy=rnd.uniform(50.0, 200.0),
+                            x=rnd.uniform(0.0, 500.0), y=rnd.uniform(0.0, 500.0), params=params))
+    foods = [Food(id=new_entity_id(), energy=50.0, position=(rnd.uniform(0.0, 500.0), rnd.uniform(0.0, 500.0)))
+             for _ in range(15)]
+    for _ in range(steps):
+        population.step(foods, max_cells=2000)
+    return population
+
+
+@pytest.mark.parametrize("mixed_params", [False, True], ids=["shared-params", "mixed-params"])
+def test_step_numba_matches_numpy(monkeypatch, mixed_params):
+    compiled = seeded_run(mixed_params)
+
+    monkeypatch.setattr(kernels, "njit", None)
+    monkeypatch.setattr(kernels, "step", kernels._step_numpy)
+    kernels.specialized_step.cache_clear()
+    try:
+        fallback = seeded_run(mixed_params)
+    finally:
+        kernels.specialized_step.cache_clear()
+
+    assert len(compiled) == len(fallback) > 400  # some cells were born
+    np.testing.assert_array_equal(compiled.age, fallback.age)
+    for name in ("energy", "x", "y", "vx", "vy", "ax", "ay"):
+        np.testing.assert_allclose(getattr(compiled, name), getattr(fallback, name), rtol=1e-5, atol=1e-6,
+                                   err_msg=name)
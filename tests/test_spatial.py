@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import spatial
+
+
+@pytest.fixture(params=["numba", "kdtree", "numpy"])
+def backend(request, monkeypatch):
+    """Run nearest() through each of its backends."""
+    if request.param == "numba":
+        if spatial.njit is None:
+            pytest.skip("numba is not installed")
+        return request.param
+    monkeypatch.setattr(spatial, "njit", None)
+    if request.param == "kdtree":
+        if spatial.cKDTree is None:
+            pytest.skip("scipy is not installed")
+    else:
+        monkeypatch.setattr(spatial, "cKDTree", None)
+    return request.param
+
+
+def brute_force(xy, other_xy):
+    d = np.asarray(other_xy)[None, :, :] - np.asarray(xy)[:, None, :]
+    return (d * d).sum(axis=2)
+
+
+def check_nearest(xy, other_xy):
+    closest = spatial.nearest(xy, other_xy)
+    dist2 = brute_force(xy, other_xy)
+    assert closest.shape == (len(xy),)
+    np.testing.assert_array_equal(dist2[np.arange(len(xy)), closest], dist2.min(axis=1))
+    return closest, dist2
+
+
+@pytest.mark.parametrize("n_other", [1, 10, 500])
+def test_nearest_matches_brute_force(backend, n_other):
+    rng = np.random.default_rng(n_other)
+    xy = rng.uniform(0.0, 1000.0, (300, 2))
+    other_xy = rng.uniform(0.0, 1000.0, (n_other, 2))
+    closest, dist2 = check_nearest(xy, other_xy)
+    np.testing.assert_array_equal(closest, np.argmin(dist2, axis=1))
+
+
+@pytest.mark.parametrize("n_side", [4, 20])
+def test_nearest_ties(backend, n_side):
+    # Integer lattice queried at lattice points and cell centres: every distance is exact
+    lattice = np.stack(np.meshgrid(np.arange(n_side), np.arange(n_side)), axis=-1).reshape(-1, 2) * 10.0
+    other_xy = np.concatenate([lattice, lattice[::3]])  # duplicates tie at distance 0
+    xy = np.concatenate([lattice, lattice + 5.0])
+    closest, dist2 = check_nearest(xy, other_xy)
+    if backend != "kdtree":  # the k-d tree may return any of the tied points
+        np.testing.assert_array_equal(closest, np.argmin(dist2, axis=1))
+
+
+def test_nearest_outside_grid(backend):
+    rng = np.random.default_rng(0)
+    other_xy = rng.uniform(0.0, 100.0, (200, 2))
+    xy = np.array([[-5000.0, -5000.0], [1e6, 50.0], [50.0, -1e6], [150.0, 150.0], [-0.5, 100.5]])
+    closest, dist2 = check_nearest(xy, other_xy)
+    np.testing.assert_array_equal(closest, np.argmin(dist2, axis=1))
+
+
+def test_nearest_empty(backend):
+    points = np.ones((3, 2))
+    np.testing.assert_array_equal(spatial.nearest(points, np.empty((0, 2))), [-1, -1, -1])
+    assert spatial.nearest(np.empty((0, 2)), points).shape == (0,)